@@ -0,0 +1,291 @@
+"""Measures the overhead of pytest-trust-random itself, using synthetic functions.
+
+Run from the root of the repository:
+    ```bash
+    python benchmarks/plugin_overhead.py --output plugin_overhead.json
+    ```
+
+Results are written as JSON, one record per measurement, so that they can be compared
+between versions of the plugin.
+"""
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pydantic
+from pydantic import create_model
+
+from pytest_trust_random import TrustRandomConfig
+from pytest_trust_random.auto_benchmarker import AutoBenchmarker
+from pytest_trust_random.base_models import (
+    BaseOutputData,
+    BaseSettingsModel,
+    BaseTestDimension,
+    BenchmarkArray,
+)
+from pytest_trust_random.func_benchmarker import FuncBenchmarker, get_test_pairs
+from pytest_trust_random.setup_func_benchmarker import SetupFuncBenchmarker
+from pytest_trust_random.utils import flatten_dict
+
+
+class NoopOutput(pydantic.BaseModel):
+    value: float
+
+
+def noop(a: float) -> NoopOutput:
+    return NoopOutput(value=a)
+
+
+def cheap(a: float) -> NoopOutput:
+    return NoopOutput(value=float(np.random.normal(a)))
+
+
+def measure(func: Callable[[], Any], repeat: int = 5) -> float:
+    """Best wall-clock time of `repeat` calls of `func`, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def measure_peak_memory(func: Callable[[], Any]) -> int:
+    """Peak memory allocated by python while calling `func`, in bytes"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def record(name: str, params: dict[str, Any], **values: float) -> dict[str, Any]:
+    print(name, params, values)
+    return {"name": name, "params": params, **values}
+
+
+def make_wide_output(n_fields: int) -> pydantic.BaseModel:
+    WideOutput = create_model(
+        f"WideOutput{n_fields}", **{f"x_{i}": (float, ...) for i in range(n_fields)}
+    )
+    return WideOutput(**{f"x_{i}": float(i) for i in range(n_fields)})
+
+
+def make_settings(iters: int) -> BaseSettingsModel:
+    return SetupFuncBenchmarker(noop).settings_model(
+        max_product=1.0,
+        benchmark_iters=iters,
+        a=BaseTestDimension[float](minimum=1.0, maximum=2.0, steps=1),
+    )
+
+
+def make_config(path: Path, **kwargs: Any) -> TrustRandomConfig:
+    return TrustRandomConfig(
+        acceptable_st_devs=3, re_runs=0, benchmark_path=str(path), **kwargs
+    )
+
+
+def bench_get_test_pairs() -> list[dict[str, Any]]:
+    results = []
+    for dims in (1, 2, 3, 4):
+        for steps in (10, 30, 100):
+            if steps**dims > 10**6:
+                continue
+            parameters = {f"p{i}": float for i in range(dims)}
+            Settings = create_model(
+                "Settings",
+                __base__=BaseSettingsModel,
+                **{k: (BaseTestDimension[float], ...) for k in parameters},
+            )
+            settings = Settings(
+                max_product=float("inf"),
+                benchmark_iters=1,
+                **{
+                    k: BaseTestDimension[float](minimum=1, maximum=100, steps=steps)
+                    for k in parameters
+                },
+            )
+            results.append(
+                record(
+                    "get_test_pairs",
+                    {"dimensions": dims, "steps": steps, "points": steps**dims},
+                    seconds=measure(lambda: get_test_pairs(settings, parameters)),
+                    peak_memory_bytes=measure_peak_memory(
+                        lambda: get_test_pairs(settings, parameters)
+                    ),
+                )
+            )
+    return results
+
+
+def bench_flatten_and_reduce(iters: int) -> list[dict[str, Any]]:
+    results = []
+    func_benchmarker = FuncBenchmarker(
+        make_settings(iters), SetupFuncBenchmarker(noop), make_config(Path("."))
+    )
+    for n_fields in (10, 100, 1000, 10000):
+        output = make_wide_output(n_fields)
+        output_dict = output.dict()
+        seconds = measure(lambda: flatten_dict(output_dict))
+        results.append(
+            record(
+                "flatten_dict",
+                {"fields": n_fields},
+                seconds=seconds,
+                fields_per_second=n_fields / seconds,
+            )
+        )
+        outputs = [output] * iters
+        seconds = measure(
+            lambda: func_benchmarker._compute_mean_and_st_dev_of_pydantic(outputs)
+        )
+        results.append(
+            record(
+                "compute_mean_and_st_dev_of_pydantic",
+                {"fields": n_fields, "iterations": iters},
+                seconds=seconds,
+                fields_per_second=n_fields * iters / seconds,
+            )
+        )
+    return results
+
+
+def bench_dispatch() -> list[dict[str, Any]]:
+    results = []
+    for backend in ("processes", "threads"):
+        for func in (noop, cheap):
+            for iters in (100, 1000):
+                func_benchmarker = FuncBenchmarker(
+                    make_settings(iters),
+                    SetupFuncBenchmarker(func),
+                    make_config(Path("."), backend=backend),
+                )
+                seconds = measure(func_benchmarker.generate_benchmark, repeat=3)
+                results.append(
+                    record(
+                        "generate_benchmark",
+                        {
+                            "backend": backend,
+                            "func": func.__name__,
+                            "iterations": iters,
+                        },
+                        seconds=seconds,
+                        seconds_per_iteration=seconds / iters,
+                    )
+                )
+    return results
+
+
+def write_benchmark_file(path: Path, n_points: int, n_fields: int) -> None:
+    data = {f"x_{i}": {"mean": float(i), "st_dev": 1.0} for i in range(n_fields)}
+    tests = [{"data": data, "a": float(i + 1)} for i in range(n_points)]
+    with open(path, "w") as benchmark_file:
+        json.dump({"tests": {"noop": tests}}, benchmark_file, indent=2)
+
+
+def bench_collect(tmp_path: Path) -> list[dict[str, Any]]:
+    results = []
+    auto_benchmarker = AutoBenchmarker(make_config(tmp_path), noop=noop)
+    for n_points in (10, 100, 1000):
+        for n_fields in (10, 100, 1000):
+            if n_points * n_fields > 10**5:
+                continue
+            auto_benchmarker.settings_folder = tmp_path / f"{n_points}_{n_fields}"
+            auto_benchmarker.settings_folder.mkdir()
+            write_benchmark_file(
+                auto_benchmarker.benchmark_file_path, n_points, n_fields
+            )
+            for validate in (False, True):
+                seconds = measure(
+                    lambda: auto_benchmarker.load_benchmark(validate=validate)
+                )
+                results.append(
+                    record(
+                        "collect_load_benchmark",
+                        {
+                            "points": n_points,
+                            "fields": n_fields,
+                            "validate": validate,
+                            "file_bytes": auto_benchmarker.benchmark_file_path.stat().st_size,
+                        },
+                        seconds=seconds,
+                    )
+                )
+    return results
+
+
+def bench_runtest(tmp_path: Path, n_items: int) -> list[dict[str, Any]]:
+    settings = {
+        "noop": {
+            "max_product": 1.0,
+            "benchmark_iters": 1,
+            "a": {"minimum": 1.0, "maximum": 2.0, "steps": 1},
+        }
+    }
+    with open(tmp_path / "settings.json", "w") as settings_file:
+        json.dump(settings, settings_file)
+    auto_benchmarker = AutoBenchmarker(make_config(tmp_path), noop=noop)
+    OutputModel = auto_benchmarker.setup_func_benchmarkers["noop"].output_model
+    data: BaseOutputData = OutputModel(
+        data={"value": BenchmarkArray(mean=1.0, st_dev=1.0)}, a=1.0
+    )
+
+    def run_items():
+        for _ in range(n_items):
+            auto_benchmarker.test_benchmark_data(data, 3, "noop")
+
+    seconds = measure(run_items)
+    return [
+        record(
+            "runtest",
+            {"items": n_items},
+            seconds=seconds,
+            seconds_per_item=seconds / n_items,
+        )
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure the overhead of pytest-trust-random itself."
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("plugin_overhead.json"),
+        help="Path of the JSON results file",
+    )
+    args = parser.parse_args()
+
+    results = []
+    results += bench_get_test_pairs()
+    results += bench_flatten_and_reduce(iters=100)
+    results += bench_dispatch()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results += bench_collect(Path(tmp_dir))
+        results += bench_runtest(Path(tmp_dir), n_items=1000)
+
+    with open(args.output, "w") as output_file:
+        json.dump(
+            {
+                "created": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            },
+            output_file,
+            indent=2,
+        )
+
+
+if __name__ == "__main__":
+    main()
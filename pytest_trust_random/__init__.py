@@ -46,7 +46,9 @@ __all__ = [
     "benchmark_test",
     "TrustRandomConfig",
     "calc_failure_prob",
+    "calc_multivariate_failure_prob",
     "FailureProbabilities",
+    "get_rng",
 ]
 
 import re
@@ -55,7 +57,7 @@ from collections import defaultdict
 from importlib.util import module_from_spec, spec_from_file_location
 from inspect import getmembers, isfunction
 from pathlib import Path
-from typing import Callable, Iterator, Type
+from typing import Callable, Iterator, Optional, Type
 
 import pytest
 
@@ -65,7 +67,13 @@ from .auto_benchmarker import (
     BaseTestModel,
     TrustRandomConfig,
 )
-from .calc_failure import FailureProbabilities, calc_failure_prob
+from .base_models import Backend
+from .calc_failure import (
+    FailureProbabilities,
+    calc_failure_prob,
+    calc_multivariate_failure_prob,
+)
+from .rng import get_rng
 
 FILE_NAME_PATTERN = re.compile(r"benchmark_test_.+.py")
 
@@ -74,7 +82,12 @@ def is_auto_benchmarker_test_file(path: Path) -> bool:
     return re.match(FILE_NAME_PATTERN, path.name) is not None
 
 
-def benchmark_test(trust_random_config: TrustRandomConfig):
+def benchmark_test(
+    trust_random_config: TrustRandomConfig,
+    backend: Optional[Backend] = None,
+    setup: Optional[Callable] = None,
+    setup_cache_size: int = 8,
+):
     """Decorator for creating benchmark tests from functions.
 
     The plugin will create tests combination of function parameters.
@@ -89,10 +102,21 @@ def benchmark_test(trust_random_config: TrustRandomConfig):
 
     Args:
         trust_random_config (TrustRandomConfig): Test configuration
+        backend (Optional[Backend]): Overrides `trust_random_config.backend` for
+                                     this function
+        setup (Optional[Callable]): Expensive initialisation, called with the
+                                    function's parameters. Its result is passed to
+                                    the function as the first argument, and cached
+                                    per worker process and set of parameters
+        setup_cache_size (int): Maximum number of cached `setup` results per
+                                process. Least recently used ones are evicted first
     """
 
     def decorator(fn):
         fn.trust_random_config = trust_random_config
+        fn.trust_random_backend = backend
+        fn.trust_random_setup = setup
+        fn.trust_random_setup_cache_size = setup_cache_size
         fn.benchmark_test = True
         return fn
 
@@ -140,10 +164,10 @@ class JSONFile(pytest.File):
     def collect(self):
         for benchmarker in self.benchmarkers:
             trust_random_config = benchmarker.trust_random_config
-            model = benchmarker.test_model
-
-            test_model = model.parse_file(benchmarker.benchmark_file_path)
-            for func_name, test in test_model.tests:
+            benchmark = benchmarker.load_benchmark(
+                validate=self.config.option.validatebenchmark
+            )
+            for func_name, test in benchmark.items():
                 for i, data in enumerate(test):
                     yield JSONItem.from_parent(
                         self,
@@ -154,6 +178,18 @@ class JSONFile(pytest.File):
                         acceptable_st_devs=trust_random_config.acceptable_st_devs,
                         acceptable_re_runs=trust_random_config.re_runs,
                     )
+                off_grid_data = benchmarker.generate_off_grid_data(func_name, test)
+                for i, data in enumerate(off_grid_data):
+                    yield JSONItem.from_parent(
+                        self,
+                        name=f"{func_name}_off_grid_{i}",
+                        func_name=func_name,
+                        data=data,
+                        benchmarker=benchmarker,
+                        acceptable_st_devs=trust_random_config.acceptable_st_devs
+                        * trust_random_config.off_grid_tolerance,
+                        acceptable_re_runs=trust_random_config.re_runs,
+                    )
 
 
 def get_benchmarkers_from_definition(file_path: Path) -> Iterator[AutoBenchmarker]:
@@ -191,14 +227,17 @@ def get_benchmark_dir(start_path: Path, auto_benchmarker: AutoBenchmarker) -> Pa
 
 
 def pytest_sessionstart(session: pytest.Session):
+    metrics_path = session.config.option.benchmarkmetrics
     for auto_benchmarker in find_benchmarks(session.startpath):
         benchmark_dir = get_benchmark_dir(session.startpath, auto_benchmarker)
 
         if not benchmark_dir.exists() or session.config.option.genbenchmark:
-            auto_benchmarker.generate_benchmark(verbose=True)
+            auto_benchmarker.generate_benchmark(verbose=True, metrics_path=metrics_path)
         else:
             if not auto_benchmarker.benchmark_file_path.exists():
-                auto_benchmarker.generate_benchmark(verbose=True)
+                auto_benchmarker.generate_benchmark(
+                    verbose=True, metrics_path=metrics_path
+                )
 
 
 def pytest_collect_file(parent: pytest.Session, file_path: Path):
@@ -218,3 +257,16 @@ def pytest_addoption(parser):
         action="store_true",
         help="Should (re)generate benchmark?",
     )
+    parser.addoption(
+        "--validatebenchmark",
+        dest="validatebenchmark",
+        action="store_true",
+        help="Fully validate benchmark files when loading them (slower)",
+    )
+    parser.addoption(
+        "--benchmarkmetrics",
+        dest="benchmarkmetrics",
+        type=Path,
+        default=None,
+        help="JSON lines file benchmark generation progress is appended to",
+    )
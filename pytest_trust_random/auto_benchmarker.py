@@ -1,9 +1,11 @@
 import json
 import time
+from contextlib import nullcontext
 from multiprocessing import cpu_count
 from pathlib import Path
-from typing import Callable, Type
+from typing import Callable, ContextManager, Optional, Type
 
+import numpy as np
 from pydantic import create_model
 
 from .base_models import (
@@ -13,6 +15,9 @@ from .base_models import (
     TrustRandomConfig,
 )
 from .func_benchmarker import FuncBenchmarker
+from .interpolation import BenchmarkInterpolator
+from .progress import ProgressMonitor
+from .serialization import read_benchmark, write_benchmark
 from .setup_func_benchmarker import SetupFuncBenchmarker
 
 # From here on we will only use benchmarker_test_func and StateStats
@@ -111,13 +116,43 @@ class AutoBenchmarker:
         if self._func_benchmarkers is None:
             self._func_benchmarkers = {
                 func_name: FuncBenchmarker(
-                    getattr(self.settings, func_name), func_setup
+                    getattr(self.settings, func_name),
+                    func_setup,
+                    self.trust_random_config,
                 )
                 for func_name, func_setup in self.setup_func_benchmarkers.items()
             }
         return self._func_benchmarkers
 
-    def generate_benchmark(self, verbose: bool = False):
+    def _progress_monitor(
+        self, verbose: bool, metrics_path: Optional[Path]
+    ) -> ContextManager[Optional[ProgressMonitor]]:
+        if not verbose and metrics_path is None:
+            return nullcontext()
+        return ProgressMonitor(
+            point_products={
+                func_name: [
+                    float(np.prod(items)) for items in func_benchmarker.test_pairs
+                ]
+                for func_name, func_benchmarker in self.func_benchmarkers.items()
+            },
+            iterations={
+                func_name: func_benchmarker.settings.benchmark_iters
+                for func_name, func_benchmarker in self.func_benchmarkers.items()
+            },
+            display=verbose,
+            metrics_path=metrics_path,
+        )
+
+    def generate_benchmark(
+        self, verbose: bool = False, metrics_path: Optional[Path] = None
+    ):
+        """Generate the benchmark file for all the functions.
+
+        Args:
+            verbose (bool): Whether to print estimates and live progress
+            metrics_path (Optional[Path]): JSON lines file progress is appended to
+        """
         func_benchmarkers = self.func_benchmarkers
 
         if verbose:
@@ -141,24 +176,73 @@ class AutoBenchmarker:
             print(f"Estimated total test time (no reruns): {total_test_time}")
 
         start = time.time()
-        all_benchmarks_out = {}
-        for func_name, func_benchmarker in func_benchmarkers.items():
-            benchmark_out = func_benchmarker.generate_benchmark()
-            all_benchmarks_out[func_name] = benchmark_out
+        with self._progress_monitor(verbose, metrics_path) as progress:
+            write_benchmark(
+                self.benchmark_file_path,
+                (
+                    (func_name, func_benchmarker.generate_benchmark(progress))
+                    for func_name, func_benchmarker in func_benchmarkers.items()
+                ),
+            )
         end = time.time()
 
         if verbose:
             print(f"Benchmark calculated in: {end-start}")
         print()
-        test_data = self.test_model.parse_obj({"tests": all_benchmarks_out})
-
-        with open(self.benchmark_file_path, "w+") as benchmark_file:
-            json.dump(test_data.dict(), benchmark_file, indent=2)
 
         # hash_file_path = Path(str(self.settings_folder) + os.sep + "data_hash.txt")
         # with open(hash_file_path, "w+") as f:
         #    f.write(str(self))
 
+    def load_benchmark(self, validate: bool = False) -> dict[str, list[BaseOutputData]]:
+        """Load benchmark data of all the functions.
+
+        Args:
+            validate (bool): If True, the benchmark file is fully validated against
+                             `test_model`. Otherwise it's trusted, which is much
+                             faster for large benchmarks.
+
+        Returns:
+            dict[str, list[BaseOutputData]]: benchmark data of each function
+        """
+        if validate:
+            return dict(self.test_model.parse_file(self.benchmark_file_path).tests)
+        output_models = {
+            func_name: setup_func_benchmarker.output_model
+            for func_name, setup_func_benchmarker in self.setup_func_benchmarkers.items()
+        }
+        return read_benchmark(self.benchmark_file_path, output_models)
+
+    def generate_off_grid_data(
+        self, func_name: str, tests: list[BaseOutputData]
+    ) -> list[BaseOutputData]:
+        """Interpolate benchmark data at random parameters between benchmarked ones.
+
+        Args:
+            func_name (str): name of the function
+            tests (list[BaseOutputData]): benchmark data of the function
+
+        Returns:
+            list[BaseOutputData]: `trust_random_config.off_grid_tests` items of
+                                  interpolated benchmark data
+        """
+        n_tests = self.trust_random_config.off_grid_tests
+        if n_tests <= 0 or not tests:
+            return []
+        setup_func_benchmarker = self.setup_func_benchmarkers[func_name]
+        interpolator = BenchmarkInterpolator(setup_func_benchmarker.parameters, tests)
+        rng = np.random.default_rng(self.trust_random_config.off_grid_seed)
+        off_grid_data = []
+        for _ in range(n_tests):
+            values = interpolator.sample_parameters(rng)
+            if values is None:
+                break
+            data = interpolator.interpolate(list(values.values()))
+            off_grid_data.append(
+                setup_func_benchmarker.output_model(data=data, **values)
+            )
+        return off_grid_data
+
     def test_benchmark_data(
         self, benchmark_data: BaseOutputData, acceptable_st_devs: float, func_name: str
     ) -> None:
@@ -1,19 +1,37 @@
-from typing import Generic, TypeVar
+from typing import Generic, Literal, Optional, TypeVar
 
 import numpy as np
 from numpy.typing import NDArray
 from pydantic import BaseModel, root_validator
 from pydantic.generics import GenericModel
 
+Backend = Literal["processes", "threads", "auto"]
+
 
 class BenchmarkArray(BaseModel):
-    mean: float
-    st_dev: float
+    """Mean and standard deviation of a field.
+
+    Both are lists for array fields, which are reduced elementwise.
+    """
+
+    mean: float | list[float]
+    st_dev: float | list[float]
 
     @classmethod
     def from_array(cls, array: NDArray[np.float_] | NDArray[np.int_]):
         return cls(mean=float(np.mean(array)), st_dev=float(np.std(array)))
 
+    @classmethod
+    def trusted(cls, mean: float | list[float], st_dev: float | list[float]):
+        """Create an instance without validation, for data known to be valid.
+
+        Faster than `construct`, which matters for benchmarks with many fields.
+        """
+        array = object.__new__(cls)
+        object.__setattr__(array, "__dict__", {"mean": mean, "st_dev": st_dev})
+        object.__setattr__(array, "__fields_set__", {"mean", "st_dev"})
+        return array
+
 
 class BaseSettingsModel(BaseModel):
     """
@@ -30,8 +48,27 @@ class GlobalSettingsModel(BaseModel):
     """
 
 
+class BenchmarkCovariance(BaseModel):
+    """Principal components of the covariance of all the fields of an output.
+
+    Components are vectors over the fields, in the order of `BaseOutputData.data`
+    (with one element per element of array fields), and `variances` are the (unbiased) variances along each of them, estimated from
+    `iterations` results with mean `mean`. Components with (nearly) zero variance are
+    omitted. `residual_variance` is the total variance outside of the components, and
+    `residual_dof` its effective degrees of freedom (0 if all components are kept).
+    """
+
+    mean: list[float]
+    iterations: int
+    components: list[list[float]]
+    variances: list[float]
+    residual_variance: float = 0.0
+    residual_dof: float = 0.0
+
+
 class BaseOutputData(BaseModel):
     data: dict[str, BenchmarkArray]
+    covariance: Optional[BenchmarkCovariance] = None
 
 
 DataT = TypeVar("DataT")
@@ -64,11 +101,43 @@ class TrustRandomConfig(BaseModel):
         re_runs (int): Maximum number of re-runs before a test is considered failed
         benchmark_path (str): Relative path of a directory where both settings and
                               generated benchmark files are stored
+        async_concurrency (int): Maximum number of concurrent evaluations of an
+                                 `async def` function in a single event loop
+        async_processes (int): Number of worker processes, each running its own
+                               event loop, used to generate benchmarks of `async def`
+                               functions. -1 uses all cores
+        off_grid_tests (int): Number of additional tests per function, run for random
+                              parameters between the benchmarked ones and checked
+                              against interpolated benchmark values
+        off_grid_tolerance (float): Factor `acceptable_st_devs` is multiplied by in
+                                    off-grid tests, to allow for interpolation error
+        off_grid_seed (Optional[int]): Seed used for choosing off-grid parameters. If
+                                       None, different ones are chosen on every run
+        backend (Backend): How benchmark iterations of (non-async) functions are run
+                           in parallel: "processes", "threads" (best for functions
+                           releasing the GIL), or "auto" to time both on the first
+                           benchmarked parameters and use the faster one
+        multivariate (bool): Whether to check all fields of an output jointly, using
+                             their covariance, instead of each of them independently.
+                             For normal outputs, a test then fails with the
+                             probability of a single field falling outside
+                             `acceptable_st_devs`
+        multivariate_max_rank (int): Maximum number of principal components of the
+                                     covariance stored for each benchmark point, the
+                                     variance outside of them is pooled
     """
 
     acceptable_st_devs: float
     re_runs: int
     benchmark_path: str
+    async_concurrency: int = 32
+    async_processes: int = 1
+    off_grid_tests: int = 0
+    off_grid_tolerance: float = 1.5
+    off_grid_seed: Optional[int] = None
+    backend: Backend = "processes"
+    multivariate: bool = False
+    multivariate_max_rank: int = 50
 
     def __hash__(self) -> int:
         """Hash method -- based on `benchmark_path`
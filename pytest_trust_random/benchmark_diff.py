@@ -0,0 +1,251 @@
+"""Compare two generations of a benchmark and rank the fields which drifted.
+
+Usage:
+    ```bash
+    trust-random-diff old_benchmarks/benchmark.json new_benchmarks/benchmark.json
+    ```
+
+Every (function, parameters, field) present in both files is compared with Welch's
+t-test, using the stored mean and standard deviation and the number of iterations
+each was computed from (`benchmark_iters`, read from `settings.json` next to the
+benchmark file, unless given explicitly).
+
+Benchmark files are read as plain JSON rather than through `BaseTestModel`, since the
+functions defining their output models aren't available to the command.
+"""
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .calc_failure import f_sf
+from .serialization import read_json
+
+FieldKey = tuple[str, str, str]
+
+
+@dataclass
+class BenchmarkFields:
+    """Flat, column-wise view of all the fields of one benchmark file"""
+
+    keys: list[FieldKey]
+    mean: NDArray[np.float_]
+    st_dev: NDArray[np.float_]
+    iters: NDArray[np.float_]
+
+
+@dataclass
+class BenchmarkDiff:
+    """Result of comparing every field present in both benchmark files"""
+
+    keys: list[FieldKey]
+    old_mean: NDArray[np.float_]
+    old_st_dev: NDArray[np.float_]
+    new_mean: NDArray[np.float_]
+    new_st_dev: NDArray[np.float_]
+    t_stat: NDArray[np.float_]
+    p_value: NDArray[np.float_]
+    only_old: list[FieldKey]
+    only_new: list[FieldKey]
+
+    def ranking(self) -> NDArray[np.int_]:
+        """Indices of compared fields, most significant drift first"""
+        return np.lexsort((-np.abs(self.t_stat), self.p_value))
+
+
+def _format_parameters(test: dict[str, Any]) -> str:
+    return ", ".join(
+        f"{k}={v}" for k, v in test.items() if k not in ("data", "covariance")
+    )
+
+
+def read_benchmark_iters(settings_path: Path) -> dict[str, int]:
+    settings = read_json(settings_path)
+    return {
+        func_name: func_settings["benchmark_iters"]
+        for func_name, func_settings in settings.items()
+    }
+
+
+def load_benchmark_fields(
+    benchmark_path: Path, iters: Optional[int] = None
+) -> BenchmarkFields:
+    """Load a `benchmark.json` file into flat arrays.
+
+    Args:
+        benchmark_path (Path): path to the benchmark file
+        iters (Optional[int]): number of iterations every benchmark was computed from.
+            If None, `benchmark_iters` of each function is read from `settings.json`
+            in the same directory.
+    """
+    benchmark = read_json(benchmark_path)
+    if iters is None:
+        func_iters = read_benchmark_iters(benchmark_path.parent / "settings.json")
+    else:
+        func_iters = {func_name: iters for func_name in benchmark["tests"]}
+
+    keys: list[FieldKey] = []
+    means: list[float] = []
+    st_devs: list[float] = []
+    iters_per_field: list[int] = []
+    for func_name, tests in benchmark["tests"].items():
+        n = func_iters[func_name]
+        for test in tests:
+            parameters = _format_parameters(test)
+            for field, values in test["data"].items():
+                if isinstance(values["mean"], list):
+                    # Elements of array fields are compared separately
+                    for i, (mean, st_dev) in enumerate(
+                        zip(values["mean"], values["st_dev"])
+                    ):
+                        keys.append((func_name, parameters, f"{field}[{i}]"))
+                        means.append(mean)
+                        st_devs.append(st_dev)
+                        iters_per_field.append(n)
+                    continue
+                keys.append((func_name, parameters, field))
+                means.append(values["mean"])
+                st_devs.append(values["st_dev"])
+                iters_per_field.append(n)
+    return BenchmarkFields(
+        keys=keys,
+        mean=np.array(means, dtype=np.float64),
+        st_dev=np.array(st_devs, dtype=np.float64),
+        iters=np.array(iters_per_field, dtype=np.float64),
+    )
+
+
+_f_sf = np.frompyfunc(f_sf, 3, 1)
+
+
+def welch_t_test(
+    mean_1: NDArray[np.float_],
+    st_dev_1: NDArray[np.float_],
+    n_1: NDArray[np.float_],
+    mean_2: NDArray[np.float_],
+    st_dev_2: NDArray[np.float_],
+    n_2: NDArray[np.float_],
+) -> tuple[NDArray[np.float_], NDArray[np.float_]]:
+    """Vectorised Welch's t-test from summary statistics.
+
+    Standard deviations are population standard deviations, as stored in the
+    benchmark. Two-sided p-values use the t distribution, with Welch-Satterthwaite
+    degrees of freedom for each field.
+
+    Returns:
+        tuple[NDArray[np.float_], NDArray[np.float_]]: t statistics and p-values
+    """
+    dof_1 = np.maximum(n_1 - 1, 1)
+    dof_2 = np.maximum(n_2 - 1, 1)
+    var_1 = st_dev_1**2 / dof_1
+    var_2 = st_dev_2**2 / dof_2
+    std_err = np.sqrt(var_1 + var_2)
+    diff = mean_2 - mean_1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_stat = np.where(
+            std_err > 0, diff / std_err, np.where(diff == 0, 0.0, np.inf * diff)
+        )
+        dof = (var_1 + var_2) ** 2 / (var_1**2 / dof_1 + var_2**2 / dof_2)
+    # The square of a t-distributed variable follows F(1, dof)
+    p_value = np.where(
+        std_err > 0,
+        _f_sf(t_stat**2, 1.0, np.where(std_err > 0, dof, 1.0)).astype(np.float64),
+        np.where(diff == 0, 1.0, 0.0),
+    )
+    return t_stat, p_value
+
+
+def diff_benchmarks(old: BenchmarkFields, new: BenchmarkFields) -> BenchmarkDiff:
+    new_index = {key: i for i, key in enumerate(new.keys)}
+    old_rows = []
+    new_rows = []
+    for i, key in enumerate(old.keys):
+        j = new_index.get(key)
+        if j is not None:
+            old_rows.append(i)
+            new_rows.append(j)
+    old_idx = np.array(old_rows, dtype=np.int_)
+    new_idx = np.array(new_rows, dtype=np.int_)
+    old_keys = set(old.keys)
+
+    t_stat, p_value = welch_t_test(
+        old.mean[old_idx],
+        old.st_dev[old_idx],
+        old.iters[old_idx],
+        new.mean[new_idx],
+        new.st_dev[new_idx],
+        new.iters[new_idx],
+    )
+    return BenchmarkDiff(
+        keys=[old.keys[i] for i in old_rows],
+        old_mean=old.mean[old_idx],
+        old_st_dev=old.st_dev[old_idx],
+        new_mean=new.mean[new_idx],
+        new_st_dev=new.st_dev[new_idx],
+        t_stat=t_stat,
+        p_value=p_value,
+        only_old=[key for key in old.keys if key not in new_index],
+        only_new=[key for key in new.keys if key not in old_keys],
+    )
+
+
+def print_report(diff: BenchmarkDiff, alpha: float, top: int) -> None:
+    n_compared = len(diff.keys)
+    significant = diff.p_value < alpha
+    significant_bonferroni = diff.p_value < alpha / max(n_compared, 1)
+
+    print(f"Fields compared: {n_compared}")
+    print(f"Fields only in old benchmark: {len(diff.only_old)}")
+    print(f"Fields only in new benchmark: {len(diff.only_new)}")
+    print(
+        f"Significant at alpha={alpha}: {int(significant.sum())} "
+        f"(expected by chance: {alpha * n_compared:.1f})"
+    )
+    print(
+        f"Significant after Bonferroni correction: {int(significant_bonferroni.sum())}"
+    )
+    if n_compared:
+        abs_t = np.abs(diff.t_stat)
+        print(f"Median |t|: {float(np.median(abs_t))}")
+        print(f"Max |t|: {float(np.max(abs_t))}")
+    print()
+
+    for i in diff.ranking()[:top]:
+        func_name, parameters, field = diff.keys[i]
+        print(
+            f"{func_name}({parameters}) {field}: "
+            f"{diff.old_mean[i]} ± {diff.old_st_dev[i]} -> "
+            f"{diff.new_mean[i]} ± {diff.new_st_dev[i]} "
+            f"(t={diff.t_stat[i]:.3f}, p={diff.p_value[i]:.3g})"
+        )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare two benchmark files and rank the fields which drifted."
+    )
+    parser.add_argument("old", type=Path, help="Path to the old benchmark.json")
+    parser.add_argument("new", type=Path, help="Path to the new benchmark.json")
+    parser.add_argument(
+        "--iters",
+        type=int,
+        default=None,
+        help="Iterations per benchmark, if settings.json files are not available",
+    )
+    parser.add_argument("--alpha", type=float, default=0.01, help="Significance level")
+    parser.add_argument(
+        "--top", type=int, default=20, help="Number of fields listed in the report"
+    )
+    args = parser.parse_args(argv)
+
+    old = load_benchmark_fields(args.old, args.iters)
+    new = load_benchmark_fields(args.new, args.iters)
+    print_report(diff_benchmarks(old, new), alpha=args.alpha, top=args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
+import math
 from dataclasses import dataclass
+from functools import lru_cache
 from statistics import NormalDist
 
 
@@ -10,6 +12,79 @@ class FailureProbabilities:
     one_test_from_all_reruns: float
 
 
+def _beta_continued_fraction(a: float, b: float, x: float) -> float:
+    """Continued fraction of the incomplete beta function, by modified Lentz's method"""
+    tiny = 1e-300
+    c = 1.0
+    d = 1 - (a + b) * x / (a + 1)
+    d = 1 / (tiny if abs(d) < tiny else d)
+    h = d
+    for m in range(1, 100000):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ):
+            d = 1 + numerator * d
+            d = 1 / (tiny if abs(d) < tiny else d)
+            c = 1 + numerator / c
+            c = tiny if abs(c) < tiny else c
+            delta = d * c
+            h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return h
+
+
+def _regularized_beta(a: float, b: float, x: float) -> float:
+    """I_x(a, b), the regularized incomplete beta function"""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        # The continued fraction converges quickly only below this point
+        return 1 - _regularized_beta(b, a, 1 - x)
+    log_prefactor = (
+        math.lgamma(a + b)
+        - math.lgamma(a)
+        - math.lgamma(b)
+        + a * math.log(x)
+        + b * math.log1p(-x)
+    )
+    return math.exp(log_prefactor) * _beta_continued_fraction(a, b, x) / a
+
+
+def f_sf(x: float, dfn: float, dfd: float) -> float:
+    """Probability of an F-distributed variable exceeding `x`"""
+    if x <= 0:
+        return 1.0
+    return _regularized_beta(dfd / 2, dfn / 2, dfd / (dfd + dfn * x))
+
+
+@lru_cache(maxsize=None)
+def f_isf(p: float, dfn: float, dfd: float) -> float:
+    """Value exceeded by an F-distributed variable with probability `p`"""
+    low, high = 0.0, 1.0
+    while f_sf(high, dfn, dfd) > p:
+        low, high = high, high * 2
+    for _ in range(200):
+        middle = (low + high) / 2
+        if f_sf(middle, dfn, dfd) > p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def multivariate_failure_rate(acceptable_st_devs: float) -> float:
+    """False failure rate of a single multivariate test.
+
+    It matches the rate of a single normally distributed field falling outside
+    `acceptable_st_devs` standard deviations.
+    """
+    return 2 * NormalDist().cdf(-acceptable_st_devs)
+
+
 def calc_failure_prob(
     acceptable_st_devs: float,
     re_runs: int,
@@ -61,3 +136,31 @@ def calc_failure_prob(
         one_test_from_all_no_reruns=prob_of_one_of_all_tests_failing,
         one_test_from_all_reruns=prob_of_one_of_all_tests_failing_reruns,
     )
+
+
+def calc_multivariate_failure_prob(
+    acceptable_st_devs: float,
+    re_runs: int,
+    n_tests: int,
+    verbose: bool = True,
+) -> FailureProbabilities:
+    """
+    Calculates and prints the probability of failure on any particular run of the
+    test suite, when `TrustRandomConfig.multivariate` is enabled.
+
+    Each test is a joint check of all the fields, whose false failure rate does not
+    depend on the number of fields (for normal outputs), so there is no need to
+    determine the number of independent variables.
+
+    Args:
+        acceptable_st_devs (float): The number of standard devs within which a test will pass
+        re_runs (int): The number of times a test is allowed to fail.
+        n_tests (int): The total number of tests.
+    """
+    return calc_failure_prob(
+        acceptable_st_devs=acceptable_st_devs,
+        re_runs=re_runs,
+        independent_variables=1,
+        n_tests=n_tests,
+        verbose=verbose,
+    )
@@ -1,5 +1,10 @@
-from collections import defaultdict
-from typing import Any, Generic, TypeVar
+import asyncio
+import math
+import time
+import warnings
+from functools import reduce
+from multiprocessing import cpu_count
+from typing import Any, Generic, Iterator, Optional, TypeVar
 
 import numpy as np
 from joblib import Parallel, delayed
@@ -7,13 +12,26 @@ from numpy.typing import NDArray
 from pydantic import BaseModel
 
 from .base_models import (
+    Backend,
     BaseOutputData,
     BaseSettingsModel,
     BaseTestDimension,
     BenchmarkArray,
+    BenchmarkCovariance,
+    TrustRandomConfig,
 )
+from .calc_failure import f_isf, multivariate_failure_rate
+from .progress import ProgressMonitor
 from .setup_func_benchmarker import SetupFuncBenchmarker
-from .utils import FlatDict, flatten_dict
+from .shared_results import (
+    FieldLayout,
+    SharedResults,
+    compute_mean_and_st_dev,
+    output_to_row,
+    run_async_into_block,
+    run_into_block,
+)
+from .utils import FlatDict, flatten_dict, gather_with_concurrency
 
 
 def get_test_pairs(
@@ -45,10 +63,7 @@ def get_test_pairs(
     # TODO: we should probably remove this constraint. It would be good to be
     # able to test functions without any parameters.
     assert len(new_arrays) != 0
-    if len(new_arrays) == 1:
-        combined_array = new_arrays[0]
-    else:
-        combined_array = np.multiply(*new_arrays)
+    combined_array = reduce(np.multiply, new_arrays)
     valid_tests = combined_array <= settings.max_product
     coords = valid_tests.nonzero()
     items_for_test = []
@@ -60,19 +75,45 @@ def get_test_pairs(
     return list(zip(*items_for_test)), total_product
 
 
+JOBLIB_BACKENDS: dict[Backend, str] = {
+    "processes": "multiprocessing",
+    "threads": "threading",
+}
+# Rows per core timed with each backend when the backend is "auto"
+CALIBRATION_ROWS_PER_CORE = 2
+
+
+def split_rows(start: int, stop: int, n_blocks: int) -> Iterator[tuple[int, int]]:
+    """Split rows `start` to `stop` into (at most) `n_blocks` contiguous blocks"""
+    if n_blocks < 1 or stop <= start:
+        return
+    bounds = np.linspace(start, stop, n_blocks + 1).astype(int)
+    for block_start, block_stop in zip(bounds[:-1], bounds[1:]):
+        if block_stop > block_start:
+            yield int(block_start), int(block_stop)
+
+
 SettingsModel = TypeVar("SettingsModel", bound=BaseSettingsModel)
 FuncReturn = TypeVar("FuncReturn", bound=BaseModel)
 
 
 class FuncBenchmarker(Generic[SettingsModel, FuncReturn]):
     def __init__(
-        self, settings: SettingsModel, func_setup: SetupFuncBenchmarker
+        self,
+        settings: SettingsModel,
+        func_setup: SetupFuncBenchmarker,
+        trust_random_config: TrustRandomConfig,
     ) -> None:
         self.settings = settings
         self.func_setup = func_setup
+        self.trust_random_config = trust_random_config
+        self.backend: Backend = func_setup.backend or trust_random_config.backend
         self.test_pairs, self.total_product = get_test_pairs(
             settings, func_setup.parameters
         )
+        self._prefetched_outputs: Optional[dict[tuple, FuncReturn | BaseException]] = (
+            None
+        )
 
     def __len__(self) -> int:
         return len(self.test_pairs)
@@ -86,40 +127,301 @@ class FuncBenchmarker(Generic[SettingsModel, FuncReturn]):
         self,
         input_stats: list[FuncReturn],
     ) -> dict[str, BenchmarkArray]:
-        flat_dicts: list[FlatDict] = [
-            flatten_dict(input_stat.dict()) for input_stat in input_stats
-        ]
-        dict_of_arrays: dict[str, list[Any]] = defaultdict(list)
-        for flat_dict in flat_dicts:
-            for k, v in flat_dict.items():
-                dict_of_arrays[k].append(v)
-        final_dict_of_arrays: dict[str, NDArray[np.float_]] = {
-            k: np.array(v) for k, v in dict_of_arrays.items()
-        }
-        return {
-            k: BenchmarkArray.from_array(v) for k, v in final_dict_of_arrays.items()
-        }
+        layout = FieldLayout.of_output(flatten_dict(input_stats[0].dict()))
+        results = np.stack([output_to_row(stat, layout) for stat in input_stats])
+        return compute_mean_and_st_dev(layout, results)
+
+    @property
+    def n_workers(self) -> int:
+        if not self.func_setup.is_async:
+            return cpu_count()
+        n_processes = self.trust_random_config.async_processes
+        return cpu_count() if n_processes == -1 else n_processes
+
+    @property
+    def n_slots(self) -> int:
+        """Number of rows computed at the same time.
+
+        There are never more workers than rows left after the first one, and each
+        worker evaluates up to `async_concurrency` rows of an async function at once.
+        """
+        rows = max(self.settings.benchmark_iters - 1, 1)
+        n_workers = min(self.n_workers, rows)
+        if self.func_setup.is_async:
+            return min(n_workers * self.trust_random_config.async_concurrency, rows)
+        return n_workers
+
+    def _compute_mean_and_st_dev_of_func(
+        self, items: tuple, point: int, progress: Optional[ProgressMonitor] = None
+    ) -> tuple[dict[str, BenchmarkArray], Optional[BenchmarkCovariance]]:
+        """Run the function `benchmark_iters` times and reduce its outputs.
+
+        Returns the mean and standard deviation of every field and, if
+        `trust_random_config.multivariate` is set, their covariance.
+
+        The first iteration runs in this process to discover the output fields. The
+        remaining iterations are split into one block of rows per worker and workers
+        write their results straight into shared memory. Async functions are
+        evaluated concurrently in one event loop per worker.
+        """
+        iters = self.settings.benchmark_iters
+        start = time.perf_counter()
+        first_output = self.func_setup.run(*items)
+        layout = FieldLayout.of_output(flatten_dict(first_output.dict()))
+        with SharedResults(layout, iters) as results:
+            results.array[0] = output_to_row(first_output, layout)
+            results.row_seconds[0] = time.perf_counter() - start
+            if progress is not None:
+                progress.start_point(
+                    self.func_setup.func_name, point, results, self.n_slots, start
+                )
+            try:
+                if self.func_setup.is_async:
+                    self._run_async_iterations(items, results)
+                else:
+                    self._run_iterations(items, results)
+            finally:
+                if progress is not None:
+                    progress.end_point()
+            covariance = None
+            if self.trust_random_config.multivariate:
+                covariance = results.covariance(
+                    self.trust_random_config.multivariate_max_rank
+                )
+                if covariance is None:
+                    warnings.warn(
+                        f"Too few benchmark_iters to estimate the covariance of "
+                        f"{self.func_setup.func_name} at {items}, its fields will be "
+                        "checked independently"
+                    )
+            return results.mean_and_st_dev(), covariance
+
+    def _run_rows(
+        self,
+        backend: Backend,
+        items: tuple,
+        results: SharedResults,
+        start: int,
+        stop: int,
+    ) -> None:
+        n_blocks = min(cpu_count(), stop - start)
+        Parallel(n_jobs=-1, backend=JOBLIB_BACKENDS[backend])(
+            delayed(run_into_block)(
+                self.func_setup.func,
+                items,
+                results.block,
+                results.layout,
+                block_start,
+                block_stop,
+            )
+            for block_start, block_stop in split_rows(start, stop, n_blocks)
+        )
+
+    def _calibrate_backend(self, items: tuple, results: SharedResults) -> int:
+        """Choose between processes and threads by timing a batch of rows with each.
+
+        Returns:
+            int: the first row not computed during calibration
+        """
+        batch = min(
+            CALIBRATION_ROWS_PER_CORE * cpu_count(), (len(results.array) - 1) // 2
+        )
+        if batch < 1:
+            return 1
+        timings: dict[Backend, float] = {}
+        start = 1
+        for backend in ("processes", "threads"):
+            calibration_start = time.perf_counter()
+            self._run_rows(backend, items, results, start, start + batch)
+            timings[backend] = time.perf_counter() - calibration_start
+            start += batch
+        self.backend = min(timings, key=lambda backend: timings[backend])
+        return start
+
+    def _run_iterations(self, items: tuple, results: SharedResults) -> None:
+        start = 1
+        if self.backend == "auto":
+            start = self._calibrate_backend(items, results)
+        backend = "processes" if self.backend == "auto" else self.backend
+        self._run_rows(backend, items, results, start, len(results.array))
+
+    def _run_async_iterations(self, items: tuple, results: SharedResults) -> None:
+        iters = self.settings.benchmark_iters
+        concurrency = self.trust_random_config.async_concurrency
+        n_processes = self.n_workers
+        if n_processes == 1:
+            run_async_into_block(
+                self.func_setup.func,
+                items,
+                results.block,
+                results.layout,
+                1,
+                iters,
+                concurrency,
+            )
+            return
+        n_blocks = min(n_processes, iters - 1)
+        Parallel(n_jobs=n_processes, backend="multiprocessing")(
+            delayed(run_async_into_block)(
+                self.func_setup.func,
+                items,
+                results.block,
+                results.layout,
+                start,
+                stop,
+                concurrency,
+            )
+            for start, stop in split_rows(1, iters, n_blocks)
+        )
 
-    def generate_benchmark(self) -> list[BaseOutputData]:
+    def generate_benchmark(
+        self, progress: Optional[ProgressMonitor] = None
+    ) -> list[BaseOutputData]:
         OutputModel = self.func_setup.output_model
 
         tests: list[BaseOutputData] = []
-        headers = [k for k in self.func_setup.parameters.keys()]
-        for items in self.test_pairs:
-            list_of_stats: list[FuncReturn] = Parallel(
-                n_jobs=-1, backend="multiprocessing"
-            )(
-                delayed(self.func_setup.func)(*items)
-                for _ in range(self.settings.benchmark_iters)
+        parameters = self.func_setup.parameters
+        for point, items in enumerate(self.test_pairs):
+            data, covariance = self._compute_mean_and_st_dev_of_func(
+                items, point, progress
             )
+            # The output is built without validation, so numpy values are converted
+            # to parameter types here
+            values = {k: T(item) for (k, T), item in zip(parameters.items(), items)}
 
-            data = self._compute_mean_and_st_dev_of_pydantic(list_of_stats)
-            values = {header: items[i] for i, header in enumerate(headers)}
-
-            test_output = OutputModel(data=data, **values)
+            test_output = OutputModel.construct(
+                data=data, covariance=covariance, **values
+            )
             tests.append(test_output)
         return tests
 
+    def _prefetch_async_outputs(self) -> None:
+        """Evaluate an async function concurrently for all test pairs.
+
+        Each prefetched output is used by the first test of its pair. Re-runs call
+        the function again. Exceptions are stored in place of the output, so that
+        they only fail the test of their own pair.
+        """
+        outputs = asyncio.run(
+            gather_with_concurrency(
+                self.trust_random_config.async_concurrency,
+                (self.func_setup.func(*items) for items in self.test_pairs),
+                return_exceptions=True,
+            )
+        )
+        self._prefetched_outputs = {
+            tuple(items): output for items, output in zip(self.test_pairs, outputs)
+        }
+
+    def _get_func_return(self, func_args: dict[str, Any]) -> FuncReturn:
+        if not self.func_setup.is_async:
+            return self.func_setup.func(**func_args)
+        if self._prefetched_outputs is None:
+            self._prefetch_async_outputs()
+        assert self._prefetched_outputs is not None
+        func_return = self._prefetched_outputs.pop(tuple(func_args.values()), None)
+        if func_return is None:
+            func_return = self.func_setup.run(**func_args)
+        if isinstance(func_return, BaseException):
+            raise func_return
+        return func_return
+
+    def _test_benchmark_data_jointly(
+        self,
+        func_return_dict: FlatDict,
+        data: dict[str, BenchmarkArray],
+        covariance: BenchmarkCovariance,
+        acceptable_st_devs: float,
+    ) -> None:
+        """Check all the fields at once, with F-tests.
+
+        The distance from the mean along the principal components is checked with the
+        prediction region of Hotelling's T-squared, which accounts for the mean and
+        covariance being estimated from a finite number of iterations. If components
+        were left out, the distance outside of them is checked too, against the
+        residual variance. The false failure rate of the two tests together is that
+        of a single field outside of `acceptable_st_devs`. Fields with no variance
+        must match the benchmark exactly.
+        """
+        for k in func_return_dict:
+            if k not in data:
+                raise RuntimeError(f"Key {k} not present in benchmark")
+        for k in data:
+            if k not in func_return_dict:
+                raise RuntimeError(f"Key {k} not present in function output")
+        layout = FieldLayout.of_data(data)
+        output_layout = FieldLayout.of_output({k: func_return_dict[k] for k in data})
+        if output_layout != layout:
+            raise RuntimeError(
+                f"Output fields {output_layout} differ from benchmark {layout}"
+            )
+        values = layout.to_row(func_return_dict[k] for k in data)
+        means = layout.to_row(v.mean for v in data.values())
+        st_devs = layout.to_row(v.st_dev for v in data.values())
+
+        labels = layout.labels()
+        for i in np.flatnonzero((st_devs == 0) & ~np.isclose(values, means)):
+            raise ValueError(
+                f"For key: {labels[i]} value {values[i]} differs from constant {means[i]}"
+            )
+
+        n = covariance.iterations
+        deviation = values - np.array(covariance.mean)
+        variances = np.array(covariance.variances)
+        rank = len(variances)
+        components = np.array(covariance.components).reshape(rank, layout.width)
+        projections = components @ deviation
+        # Name, statistic, and numerator and denominator degrees of freedom
+        f_tests: list[tuple[str, float, float, float]] = []
+        if rank:
+            t_squared = n / (n + 1) * float(np.sum(projections**2 / variances))
+            statistic = t_squared * (n - rank) / (rank * (n - 1))
+            f_tests.append(("Joint", statistic, rank, n - rank))
+        if covariance.residual_dof:
+            residual = deviation - components.T @ projections
+            statistic = (
+                n / (n + 1) * float(residual @ residual) / covariance.residual_variance
+            )
+            dof = covariance.residual_dof
+            f_tests.append(("Residual", statistic, dof, (n - 1) * dof))
+        if not f_tests:
+            return
+
+        # Šidák correction, the tests being independent for normal outputs
+        failure_rate = -math.expm1(
+            math.log1p(-multivariate_failure_rate(acceptable_st_devs)) / len(f_tests)
+        )
+        for name, statistic, dfn, dfd in f_tests:
+            threshold = f_isf(failure_rate, dfn, dfd)
+            if statistic > threshold:
+                raise ValueError(
+                    f"{name} statistic: {statistic} surpasses threshold: {threshold} "
+                    f"(F with {dfn:g} and {dfd:g} degrees of freedom)"
+                )
+
+    @staticmethod
+    def _test_array_field(
+        k: str,
+        values: NDArray[np.float_],
+        benchmark_item: BenchmarkArray,
+        acceptable_st_devs: float,
+    ) -> None:
+        """Check every element of an array field against its own bounds"""
+        mean = np.asarray(benchmark_item.mean)
+        st_dev = np.asarray(benchmark_item.st_dev)
+        if mean.shape != values.shape:
+            raise RuntimeError(f"Shape of key {k} differs from benchmark")
+        lower_bounds = mean - acceptable_st_devs * st_dev
+        upper_bounds = mean + acceptable_st_devs * st_dev
+        for i in np.flatnonzero(values < lower_bounds):
+            raise ValueError(
+                f"For key: {k}[{i}] lower bound: {lower_bounds[i]} surpassed by value {values[i]}"
+            )
+        for i in np.flatnonzero(values > upper_bounds):
+            raise ValueError(
+                f"For key: {k}[{i}] upper bound: {upper_bounds[i]} surpassed by value {values[i]}"
+            )
+
     def test_benchmark_data(
         self, benchmark_data: BaseOutputData, acceptable_st_devs: float
     ) -> None:
@@ -127,13 +429,24 @@ class FuncBenchmarker(Generic[SettingsModel, FuncReturn]):
             dimension: getattr(benchmark_data, dimension)
             for dimension in self.func_setup.parameters.keys()
         }
-        func_return = self.func_setup.func(**func_args)
+        func_return = self._get_func_return(func_args)
         func_return_dict = flatten_dict(func_return.dict())
+        covariance = benchmark_data.covariance
+        if self.trust_random_config.multivariate and covariance is not None:
+            self._test_benchmark_data_jointly(
+                func_return_dict, benchmark_data.data, covariance, acceptable_st_devs
+            )
+            return
         for k, v in func_return_dict.items():
             if k not in benchmark_data.data:
                 raise RuntimeError(f"Key {k} not present in benchmark")
             else:
                 benchmark_item = benchmark_data.data[k]
+            if isinstance(v, np.ndarray) or isinstance(benchmark_item.mean, list):
+                self._test_array_field(
+                    k, np.asarray(v), benchmark_item, acceptable_st_devs
+                )
+                continue
             benchmark_item_mean = benchmark_item.mean
             benchmark_item_st_dev = benchmark_item.st_dev
             benchmark_lower_bound = (
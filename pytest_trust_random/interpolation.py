@@ -0,0 +1,136 @@
+from itertools import product
+from typing import Optional, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .base_models import BaseOutputData, BenchmarkArray
+from .shared_results import FieldLayout
+
+
+def _interpolate_values(
+    weights: NDArray[np.float_], values: NDArray[np.float_]
+) -> NDArray[np.float_]:
+    """Weighted combination of (corners, fields) values.
+
+    Fields which are positive in all corners are interpolated geometrically, which is
+    exact for values scaling as a power of the parameters. The rest are interpolated
+    linearly. Fields equal in all corners are returned as is, so that constant fields
+    (with no standard deviation) are not altered by rounding.
+    """
+    linear = np.sum(weights * values, axis=0)
+    positive = np.all(values > 0, axis=0)
+    constant = np.all(values == values[0], axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        geometric = np.exp(np.sum(weights * np.log(values), axis=0))
+    return np.where(constant, values[0], np.where(positive, geometric, linear))
+
+
+class BenchmarkInterpolator:
+    """Multilinear interpolation of benchmark means and standard deviations.
+
+    Interpolation is done in log-parameter space, matching the geometric spacing of
+    the benchmarked parameters. Fields with no standard deviation in any corner of
+    the cell are given the spread of their corner values as standard deviation, as
+    they are only exact when equal in all the corners. Only grid cells with all their corners benchmarked
+    (i.e. not excluded by `max_product`) can be sampled from.
+    """
+
+    def __init__(
+        self, parameters: dict[str, type], tests: Sequence[BaseOutputData]
+    ) -> None:
+        assert len(tests) != 0, "Cannot interpolate an empty benchmark"
+        self.parameters = parameters
+        self.layout = FieldLayout.of_data(tests[0].data)
+        grids = [
+            np.unique([getattr(test, k) for test in tests]).astype(np.float64)
+            for k in parameters
+        ]
+        self.log_grids = [np.log(grid) for grid in grids]
+
+        shape = tuple(len(grid) for grid in grids)
+        self.mean = np.full(shape + (self.layout.width,), np.nan)
+        self.st_dev = np.full(shape + (self.layout.width,), np.nan)
+        for test in tests:
+            index = tuple(
+                int(np.searchsorted(grid, getattr(test, k)))
+                for grid, k in zip(grids, parameters)
+            )
+            self.mean[index] = self.layout.to_row(v.mean for v in test.data.values())
+            self.st_dev[index] = self.layout.to_row(
+                v.st_dev for v in test.data.values()
+            )
+
+        if self.layout.width:
+            cell_valid = ~np.isnan(self.mean[..., 0])
+        else:
+            cell_valid = np.zeros(shape, dtype=bool)
+        for axis, n in enumerate(shape):
+            if n > 1:
+                cell_valid = cell_valid.take(range(n - 1), axis) & cell_valid.take(
+                    range(1, n), axis
+                )
+        self.cells: NDArray[np.int_] = np.argwhere(cell_valid)
+
+    def sample_parameters(self, rng: np.random.Generator) -> Optional[dict]:
+        """Pick parameters uniformly in log space within a random valid grid cell.
+
+        Returns:
+            Optional[dict]: parameter values, or None if there are no valid cells
+        """
+        if len(self.cells) == 0:
+            return None
+        cell = self.cells[rng.integers(len(self.cells))]
+        values = {}
+        for (k, T), log_grid, i in zip(self.parameters.items(), self.log_grids, cell):
+            if len(log_grid) == 1:
+                value = float(np.exp(log_grid[0]))
+            else:
+                value = float(np.exp(rng.uniform(log_grid[i], log_grid[i + 1])))
+            values[k] = T(round(value)) if issubclass(T, int) else T(value)
+        return values
+
+    def interpolate(self, point: Sequence[float]) -> dict[str, BenchmarkArray]:
+        lower = []
+        weights = []
+        for log_grid, value in zip(self.log_grids, np.log(point)):
+            if len(log_grid) == 1:
+                lower.append(0)
+                weights.append(0.0)
+                continue
+            i = int(
+                np.clip(
+                    np.searchsorted(log_grid, value, side="right") - 1,
+                    0,
+                    len(log_grid) - 2,
+                )
+            )
+            lower.append(i)
+            weights.append((value - log_grid[i]) / (log_grid[i + 1] - log_grid[i]))
+
+        corner_weights = []
+        corner_indices = []
+        for corner in product((0, 1), repeat=len(lower)):
+            weight = np.prod([w if c else 1 - w for w, c in zip(weights, corner)])
+            if weight != 0:
+                corner_weights.append(weight)
+                corner_indices.append(tuple(i + c for i, c in zip(lower, corner)))
+        w = np.array(corner_weights)[:, np.newaxis]
+        corner_means = np.stack([self.mean[i] for i in corner_indices])
+        corner_st_devs = np.stack([self.st_dev[i] for i in corner_indices])
+        mean = _interpolate_values(w, corner_means)
+        st_dev = _interpolate_values(w, corner_st_devs)
+        # Deterministic fields can't be interpolated exactly unless they're constant,
+        # so they may deviate up to the spread of their values in the corners
+        deterministic = np.all(corner_st_devs == 0, axis=0)
+        spread = np.ptp(corner_means, axis=0)
+        st_dev = np.where(deterministic, spread, st_dev)
+        return {
+            k: BenchmarkArray(
+                mean=m if isinstance(m, float) else m.tolist(),
+                st_dev=s if isinstance(s, float) else s.tolist(),
+            )
+            for (k, m), (_, s) in zip(
+                self.layout.split(mean), self.layout.split(st_dev)
+            )
+        }
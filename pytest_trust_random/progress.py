@@ -0,0 +1,238 @@
+import json
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import IO, Optional
+
+import numpy as np
+
+from .shared_results import SharedResults
+
+
+@dataclass
+class ProgressSnapshot:
+    event: str
+    timestamp: float
+    elapsed_seconds: float
+    func_name: str
+    point: int
+    points: int
+    point_iterations_done: int
+    point_iterations: int
+    func_fraction_done: float
+    fraction_done: float
+    iterations_per_second: float
+    worker_utilisation: float
+    eta_seconds: Optional[float]
+
+    def __str__(self) -> str:
+        eta = (
+            "?"
+            if self.eta_seconds is None
+            else timedelta(seconds=int(self.eta_seconds))
+        )
+        return (
+            f"[{self.func_name}] point {self.point + 1}/{self.points}"
+            f" | iters {self.point_iterations_done}/{self.point_iterations}"
+            f" | function {self.func_fraction_done:.1%}"
+            f" | overall {self.fraction_done:.1%}"
+            f" | {self.iterations_per_second:.1f} it/s"
+            f" | workers {self.worker_utilisation:.0%}"
+            f" | ETA {eta}"
+        )
+
+
+@dataclass
+class _CurrentPoint:
+    func_name: str
+    point: int
+    results: SharedResults
+    n_slots: int
+    start: float
+
+
+class ProgressMonitor:
+    """Live progress and throughput of benchmark generation.
+
+    Work of a point is measured as the product of its parameters times the number of
+    iterations, as in `FuncBenchmarker.estimate_computation_time`. Time per unit of
+    work is learnt separately for each function, as an exponentially weighted
+    average over its completed points, and used for the ETA.
+
+    While a point is computed, a background thread polls the time of every row in
+    its `SharedResults`, and reports progress to the terminal and/or as JSON lines
+    to `metrics_path`.
+
+    Args:
+        point_products (dict[str, list[float]]): product of parameters of every
+                                                 point, for each function
+        iterations (dict[str, int]): benchmark iterations of each function
+        display (bool): Whether to show progress in the terminal
+        metrics_path (Optional[Path]): JSON lines file the progress is appended to
+        interval (float): Time between updates, in seconds
+        smoothing (float): Weight of the latest point in the time per unit of work
+    """
+
+    def __init__(
+        self,
+        point_products: dict[str, list[float]],
+        iterations: dict[str, int],
+        display: bool = True,
+        metrics_path: Optional[Path] = None,
+        interval: float = 1.0,
+        smoothing: float = 0.3,
+    ) -> None:
+        self.point_products = point_products
+        self.iterations = iterations
+        self.display = display
+        self.metrics_path = metrics_path
+        self.interval = interval
+        self.smoothing = smoothing
+
+        self._total_work = {
+            func_name: sum(products) * iterations[func_name]
+            for func_name, products in point_products.items()
+        }
+        self._done_work = {func_name: 0.0 for func_name in point_products}
+        self._seconds_per_work: dict[str, float] = {}
+        self._current: Optional[_CurrentPoint] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._metrics_file: Optional[IO[str]] = None
+        self._start = time.perf_counter()
+
+    def __enter__(self) -> "ProgressMonitor":
+        self._start = time.perf_counter()
+        if self.metrics_path is not None:
+            self._metrics_file = open(self.metrics_path, "a")
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._stop.set()
+        self._thread.join()
+        if self.display:
+            print()
+        if self._metrics_file is not None:
+            self._metrics_file.write(
+                json.dumps(
+                    {
+                        "event": "done",
+                        "timestamp": time.time(),
+                        "elapsed_seconds": time.perf_counter() - self._start,
+                    }
+                )
+                + "\n"
+            )
+            self._metrics_file.close()
+
+    def start_point(
+        self,
+        func_name: str,
+        point: int,
+        results: SharedResults,
+        n_slots: int,
+        start: float,
+    ) -> None:
+        """Start following the progress of a point.
+
+        Args:
+            func_name (str): name of the function
+            point (int): index of the point in the function's test pairs
+            results (SharedResults): results of the point, being computed
+            n_slots (int): number of rows computed at the same time, i.e. workers
+                           times the concurrency of each of them
+            start (float): `time.perf_counter()` when the point was started
+        """
+        with self._lock:
+            self._current = _CurrentPoint(func_name, point, results, n_slots, start)
+
+    def end_point(self) -> None:
+        with self._lock:
+            current = self._current
+            if current is None:
+                return
+            snapshot = self._snapshot(current, "point_done")
+            func_name = current.func_name
+            work = (
+                self.point_products[func_name][current.point]
+                * self.iterations[func_name]
+            )
+            seconds_per_work = (time.perf_counter() - current.start) / work
+            previous = self._seconds_per_work.get(func_name)
+            if previous is not None:
+                seconds_per_work = (
+                    self.smoothing * seconds_per_work + (1 - self.smoothing) * previous
+                )
+            self._seconds_per_work[func_name] = seconds_per_work
+            self._done_work[func_name] += work
+            self._current = None
+            self._report(snapshot)
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                if self._current is None:
+                    continue
+                self._report(self._snapshot(self._current, "progress"))
+
+    def _snapshot(self, current: _CurrentPoint, event: str) -> ProgressSnapshot:
+        now = time.perf_counter()
+        func_name = current.func_name
+        row_seconds = current.results.row_seconds
+        rows_done = row_seconds[~np.isnan(row_seconds)]
+        iterations_done = len(rows_done)
+        point_elapsed = max(now - current.start, 1e-9)
+        point_product = self.point_products[func_name][current.point]
+
+        done_work = dict(self._done_work)
+        done_work[func_name] += point_product * iterations_done
+
+        seconds_per_work = dict(self._seconds_per_work)
+        if func_name not in seconds_per_work and iterations_done:
+            seconds_per_work[func_name] = point_elapsed / (
+                point_product * iterations_done
+            )
+        eta_seconds: Optional[float] = 0.0
+        for name, total_work in self._total_work.items():
+            remaining_work = total_work - done_work[name]
+            if remaining_work <= 0:
+                continue
+            rate = seconds_per_work.get(name)
+            if rate is None:
+                if not seconds_per_work:
+                    eta_seconds = None
+                    break
+                # Functions not started yet get the average rate of the others
+                rate = float(np.mean(list(seconds_per_work.values())))
+            assert eta_seconds is not None
+            eta_seconds += remaining_work * rate
+
+        return ProgressSnapshot(
+            event=event,
+            timestamp=time.time(),
+            elapsed_seconds=now - self._start,
+            func_name=func_name,
+            point=current.point,
+            points=len(self.point_products[func_name]),
+            point_iterations_done=iterations_done,
+            point_iterations=self.iterations[func_name],
+            func_fraction_done=done_work[func_name] / self._total_work[func_name],
+            fraction_done=sum(done_work.values()) / sum(self._total_work.values()),
+            iterations_per_second=iterations_done / point_elapsed,
+            worker_utilisation=float(np.sum(rows_done))
+            / (current.n_slots * point_elapsed),
+            eta_seconds=eta_seconds,
+        )
+
+    def _report(self, snapshot: ProgressSnapshot) -> None:
+        if self.display:
+            sys.stdout.write(f"\r{snapshot}\033[K")
+            sys.stdout.flush()
+        if self._metrics_file is not None:
+            self._metrics_file.write(json.dumps(asdict(snapshot)) + "\n")
+            self._metrics_file.flush()
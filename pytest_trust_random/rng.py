@@ -0,0 +1,29 @@
+import os
+import threading
+
+import numpy as np
+
+_local = threading.local()
+
+
+def get_rng() -> np.random.Generator:
+    """Random number generator of the current thread.
+
+    Every thread (and every worker process) gets its own, independently seeded
+    generator. Functions under test should use it instead of the global `np.random`
+    functions, which share a single, locked state between threads and are copied
+    as-is into forked worker processes.
+
+    Examples:
+        >>> @benchmark_test(config)
+        ... def coin_tosser(n: int) -> CoinTosserStats:
+        ...     heads = get_rng().binomial(n, 0.5)
+        ...     return CoinTosserStats(no_of_heads=heads)
+
+    Returns:
+        np.random.Generator: generator local to the current thread
+    """
+    if getattr(_local, "pid", None) != os.getpid():
+        _local.rng = np.random.default_rng()
+        _local.pid = os.getpid()
+    return _local.rng
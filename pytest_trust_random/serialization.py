@@ -0,0 +1,141 @@
+import json
+from pathlib import Path
+from typing import IO, Any, Iterable, Type
+
+from .base_models import BaseOutputData, BenchmarkArray, BenchmarkCovariance
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_json(obj: Any) -> bytes:
+    """Serialize `obj` to JSON, with orjson if it is installed.
+
+    orjson writes NaN and infinities as `null`, so anything containing `null` is
+    serialized again with the standard library, which keeps them as `NaN`,
+    `Infinity` and `-Infinity`.
+    """
+    if orjson is not None:
+        data = orjson.dumps(obj)
+        if b"null" not in data:
+            return data
+    return json.dumps(obj).encode()
+
+
+def loads_json(data: bytes | str) -> Any:
+    """Parse JSON, with orjson if it is installed.
+
+    orjson rejects `NaN` and infinities, so such documents are parsed with the
+    standard library.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def read_json(path: Path) -> Any:
+    with open(path, "rb") as json_file:
+        return loads_json(json_file.read())
+
+
+def _output_data_to_dict(output_data: BaseOutputData) -> dict[str, Any]:
+    item = {
+        "data": {
+            k: {"mean": v.mean, "st_dev": v.st_dev} for k, v in output_data.data.items()
+        }
+    }
+    covariance = output_data.covariance
+    if covariance is not None:
+        item["covariance"] = {
+            "mean": covariance.mean,
+            "iterations": covariance.iterations,
+            "components": covariance.components,
+            "variances": covariance.variances,
+            "residual_variance": covariance.residual_variance,
+            "residual_dof": covariance.residual_dof,
+        }
+    item.update(
+        (k, v)
+        for k, v in output_data.__dict__.items()
+        if k not in ("data", "covariance")
+    )
+    return item
+
+
+def _write_func_tests(
+    benchmark_file: IO[bytes], func_name: str, tests: list[BaseOutputData]
+) -> None:
+    benchmark_file.write(b"\n  " + dumps_json(func_name) + b": [")
+    for i, test in enumerate(tests):
+        if i:
+            benchmark_file.write(b",")
+        benchmark_file.write(b"\n    " + dumps_json(_output_data_to_dict(test)))
+    benchmark_file.write(b"\n  ]")
+
+
+def write_benchmark(
+    path: Path, all_tests: Iterable[tuple[str, list[BaseOutputData]]]
+) -> None:
+    """Write benchmark data one function at a time, one test per line.
+
+    The tests of each function are written as soon as `all_tests` yields them, so
+    only one function's tests are held in memory at once. The file is written under
+    a temporary name first, which is removed if writing fails, so that an
+    interrupted generation does not leave a truncated benchmark behind.
+
+    Args:
+        path (Path): path to the benchmark file
+        all_tests (Iterable[tuple[str, list[BaseOutputData]]]): function names and
+                                                                 their benchmark data
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as benchmark_file:
+            benchmark_file.write(b'{"tests": {')
+            for i, (func_name, tests) in enumerate(all_tests):
+                if i:
+                    benchmark_file.write(b",")
+                _write_func_tests(benchmark_file, func_name, tests)
+            benchmark_file.write(b"\n}}\n")
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    tmp_path.replace(path)
+
+
+def read_benchmark(
+    path: Path, output_models: dict[str, Type[BaseOutputData]]
+) -> dict[str, list[BaseOutputData]]:
+    """Read benchmark data without validating it.
+
+    Args:
+        path (Path): path to the benchmark file
+        output_models (dict[str, Type[BaseOutputData]]): output model of each function
+
+    Returns:
+        dict[str, list[BaseOutputData]]: benchmark data of each function
+    """
+    all_tests = read_json(path)["tests"]
+    benchmark = {}
+    for func_name, OutputModel in output_models.items():
+        if func_name not in all_tests:
+            raise RuntimeError(f"Function {func_name} not present in benchmark")
+        tests = []
+        for test in all_tests[func_name]:
+            data = {
+                k: BenchmarkArray.trusted(v["mean"], v["st_dev"])
+                for k, v in test.pop("data").items()
+            }
+            covariance = test.pop("covariance", None)
+            if covariance is not None:
+                covariance = BenchmarkCovariance.construct(**covariance)
+            tests.append(
+                OutputModel.construct(data=data, covariance=covariance, **test)
+            )
+        benchmark[func_name] = tests
+    return benchmark
@@ -1,13 +1,17 @@
+import asyncio
 import dis
 import io
-from inspect import signature
-from typing import Callable, Generic, Optional, Type, TypeVar
+import threading
+from functools import lru_cache
+from inspect import iscoroutinefunction, signature
+from typing import Any, Callable, Generic, Optional, Type, TypeVar
 
 from pydantic import BaseModel, create_model
 
 from pytest_trust_random.utils import read_value_from_input
 
 from .base_models import (
+    Backend,
     BaseOutputData,
     BaseSettingsModel,
     BaseTestDimension,
@@ -30,10 +34,55 @@ def get_func_info(func) -> str:
 
 FuncReturn = TypeVar("FuncReturn", bound=BaseModel)
 
+_setup_caches: dict[tuple[Callable, int], Callable] = {}
+_setup_caches_lock = threading.Lock()
+
+
+def get_cached_setup(setup: Callable, maxsize: int) -> Callable:
+    """`setup` with its results cached in the current process, with LRU eviction.
+
+    There is one cache per `setup` and `maxsize`, so functions sharing a setup with
+    different cache sizes each get the size they asked for.
+    """
+    key = (setup, maxsize)
+    with _setup_caches_lock:
+        if key not in _setup_caches:
+            _setup_caches[key] = lru_cache(maxsize=maxsize)(setup)
+        return _setup_caches[key]
+
+
+class FuncWithSetup:
+    """Picklable wrapper calling `func(setup(*parameters), *parameters)`.
+
+    Results of `setup` are cached once per process and set of parameters, so they
+    are shared by all the iterations run by a worker.
+    """
+
+    def __init__(
+        self,
+        func: Callable,
+        setup: Callable,
+        parameter_names: list[str],
+        cache_size: int,
+    ) -> None:
+        self.func = func
+        self.setup = setup
+        self.parameter_names = parameter_names
+        self.cache_size = cache_size
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        values = dict(zip(self.parameter_names, args), **kwargs)
+        ordered_values = [values[k] for k in self.parameter_names]
+        context = get_cached_setup(self.setup, self.cache_size)(*ordered_values)
+        return self.func(context, *ordered_values)
+
 
 class SetupFuncBenchmarker(Generic[FuncReturn]):
     parameters: dict[str, type]
     func: Callable[..., FuncReturn]
+    setup: Optional[Callable]
+    is_async: bool
+    backend: Optional[Backend]
     return_type: FuncReturn
     func_name: str
     camel_name: str
@@ -51,8 +100,14 @@ class SetupFuncBenchmarker(Generic[FuncReturn]):
             return_type, BaseModel  # type: ignore
         ), "Function return must inherit from BaseModel"
         parameters = {v.name: v.annotation for _, v in sig.parameters.items()}
+        self.setup = getattr(func, "trust_random_setup", None)
+        if self.setup is not None:
+            # The first parameter receives the result of setup
+            parameters.pop(next(iter(parameters)))
         self.parameters = parameters
         self.func = func
+        self.is_async = iscoroutinefunction(func)
+        self.backend = getattr(func, "trust_random_backend", None)
         self.return_type = return_type
         self.func_name = func.__name__
         self.camel_name = snake_to_camel_case(self.func_name)
@@ -66,10 +121,24 @@ class SetupFuncBenchmarker(Generic[FuncReturn]):
             + str(self.parameters)
             + str(self.return_type.schema())
         )
+        if self.setup is not None:
+            self.func_info += get_func_info(self.setup)
+            self.func = FuncWithSetup(
+                func,
+                self.setup,
+                list(self.parameters),
+                func.trust_random_setup_cache_size,
+            )
 
     def __str__(self) -> str:
         return self.func_info.replace("\n", "")
 
+    def run(self, *args: Any, **kwargs: Any) -> FuncReturn:
+        """Call the function, running it in a new event loop if it's async"""
+        if self.is_async:
+            return asyncio.run(self.func(*args, **kwargs))
+        return self.func(*args, **kwargs)
+
     def _generate_settings_model(self) -> Type[BaseSettingsModel]:
         attributes: dict[str, tuple[type, ellipsis]] = {
             k: (BaseTestDimension[t], ...)  # type:ignore
@@ -0,0 +1,310 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Awaitable, Callable, Iterable, Iterator, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+from pydantic import BaseModel
+
+from .base_models import BenchmarkArray, BenchmarkCovariance
+from .utils import FlatDict, flatten_dict, gather_with_concurrency
+
+
+@dataclass(frozen=True)
+class SharedBlock:
+    """Picklable descriptor of a `SharedResults` buffer.
+
+    Only this descriptor is sent to the workers, the results themselves are written
+    directly into shared memory.
+    """
+
+    name: str
+    shape: tuple[int, int]
+
+
+@dataclass(frozen=True)
+class FieldLayout:
+    """Columns taken by the flattened fields of an output in a row of results.
+
+    Scalar fields take a single column, and array fields one column per element.
+    `sizes` is None for scalar fields.
+    """
+
+    keys: tuple[str, ...]
+    sizes: tuple[Optional[int], ...]
+
+    @classmethod
+    def of_output(cls, flat_dict: FlatDict) -> "FieldLayout":
+        return cls(
+            tuple(flat_dict),
+            tuple(
+                v.size if isinstance(v, np.ndarray) else None
+                for v in flat_dict.values()
+            ),
+        )
+
+    @classmethod
+    def of_data(cls, data: dict[str, BenchmarkArray]) -> "FieldLayout":
+        return cls(
+            tuple(data),
+            tuple(
+                len(v.mean) if isinstance(v.mean, list) else None for v in data.values()
+            ),
+        )
+
+    @property
+    def width(self) -> int:
+        return sum(1 if size is None else size for size in self.sizes)
+
+    def labels(self) -> list[str]:
+        """Name of every column: the key of scalar fields, `key[i]` for arrays"""
+        labels = []
+        for k, size in zip(self.keys, self.sizes):
+            if size is None:
+                labels.append(k)
+            else:
+                labels.extend(f"{k}[{i}]" for i in range(size))
+        return labels
+
+    def to_row(
+        self, values: Iterable[float | list[float] | NDArray[np.float_]]
+    ) -> NDArray[np.float_]:
+        """Concatenate the values of every field, in the order of `keys`"""
+        if not self.keys:
+            return np.empty(0)
+        return np.hstack(list(values)).astype(np.float64, copy=False)
+
+    def split(
+        self, row: NDArray[np.float_]
+    ) -> Iterator[tuple[str, float | NDArray[np.float_]]]:
+        """Inverse of `to_row`: the key and value of every field"""
+        start = 0
+        for k, size in zip(self.keys, self.sizes):
+            if size is None:
+                yield k, float(row[start])
+                start += 1
+            else:
+                yield k, row[start : start + size]
+                start += size
+
+
+def output_to_row(output: BaseModel, layout: FieldLayout) -> NDArray[np.float_]:
+    """Flatten a function output into a row of floats ordered by `layout`.
+
+    Raises:
+        RuntimeError: if the flattened output does not have exactly the fields of
+                      `layout`, with the same sizes
+    """
+    flat_dict = flatten_dict(output.dict())
+    output_layout = FieldLayout.of_output(flat_dict)
+    if output_layout != layout:
+        raise RuntimeError(
+            f"Output fields {output_layout} differ from expected {layout}"
+        )
+    return layout.to_row(flat_dict.values())
+
+
+def compute_mean_and_st_dev(
+    layout: FieldLayout, results: NDArray[np.float_]
+) -> dict[str, BenchmarkArray]:
+    """Reduce a (iterations, columns) array of results into a `BenchmarkArray` per key.
+
+    Array fields are reduced elementwise, into a single `BenchmarkArray` of lists.
+    """
+    means = layout.split(results.mean(axis=0))
+    st_devs = layout.split(results.std(axis=0))
+    return {
+        k: BenchmarkArray.trusted(
+            mean if isinstance(mean, float) else mean.tolist(),
+            st_dev if isinstance(st_dev, float) else st_dev.tolist(),
+        )
+        for (k, mean), (_, st_dev) in zip(means, st_devs)
+    }
+
+
+def _block_views(
+    block: SharedBlock, buffer: memoryview
+) -> tuple[NDArray[np.float_], NDArray[np.float_]]:
+    """Results array and per-row durations stored in the memory of `block`"""
+    n_rows, n_columns = block.shape
+    array: NDArray[np.float_] = np.ndarray(block.shape, dtype=np.float64, buffer=buffer)
+    row_seconds: NDArray[np.float_] = np.ndarray(
+        (n_rows,),
+        dtype=np.float64,
+        buffer=buffer,
+        offset=n_rows * n_columns * np.float64().itemsize,
+    )
+    return array, row_seconds
+
+
+def _principal_components(
+    centred: NDArray[np.float_], tolerance: float
+) -> tuple[NDArray[np.float_], NDArray[np.float_]]:
+    """Principal components of centred rows, and the unbiased variance along each.
+
+    Computed from the singular value decomposition of the rows, so the full fields x
+    fields covariance matrix is never built. Components with a variance below
+    `tolerance` times the largest one are dropped.
+    """
+    _, singular_values, components = np.linalg.svd(centred, full_matrices=False)
+    variances = singular_values**2 / max(len(centred) - 1, 1)
+    if len(variances) == 0 or variances[0] <= 0:
+        return components[:0], variances[:0]
+    rank = int(np.sum(variances > tolerance * variances[0]))
+    return components[:rank], variances[:rank]
+
+
+def compute_covariance(
+    results: NDArray[np.float_], max_rank: int, tolerance: float = 1e-12
+) -> Optional[BenchmarkCovariance]:
+    """Covariance of (iterations, columns) results, as its principal components.
+
+    If there are at most `max_rank` components, and fewer than iterations - 1, all of
+    them are estimated from all the results. Otherwise, the components are chosen with
+    the first half of the results, and the variances along them and outside of them
+    are estimated from the second half, so that they are not biased by the choice.
+
+    Returns:
+        Optional[BenchmarkCovariance]: the covariance, or None if there are too few
+                                       iterations to estimate it
+    """
+    n_rows = len(results)
+    mean = results.mean(axis=0)
+    components, variances = _principal_components(results - mean, tolerance)
+    if len(variances) <= max_rank and len(variances) < n_rows - 1:
+        return BenchmarkCovariance.construct(
+            mean=mean.tolist(),
+            iterations=n_rows,
+            components=components.tolist(),
+            variances=variances.tolist(),
+        )
+
+    fit, check = results[: n_rows // 2], results[n_rows // 2 :]
+    # The F-test of the components needs more iterations than components
+    rank = min(max_rank, len(check) - 2)
+    if rank < 1:
+        return None
+    fit_components, _ = _principal_components(fit - fit.mean(axis=0), tolerance)
+    fit_components = fit_components[:rank]
+    check_mean = check.mean(axis=0)
+    centred = check - check_mean
+    projections = centred @ fit_components.T
+    # Rotated within the chosen components, so that they are uncorrelated in `check`
+    rotation, variances = _principal_components(projections, tolerance)
+    residual_variances = _principal_components(
+        centred - projections @ fit_components, tolerance
+    )[1]
+    residual_variance = float(np.sum(residual_variances))
+    residual_dof = (
+        residual_variance**2 / float(np.sum(residual_variances**2))
+        if residual_variance > 0
+        else 0.0
+    )
+    return BenchmarkCovariance.construct(
+        mean=check_mean.tolist(),
+        iterations=len(check),
+        components=(rotation @ fit_components).tolist(),
+        variances=variances.tolist(),
+        residual_variance=residual_variance,
+        residual_dof=residual_dof,
+    )
+
+
+class SharedResults:
+    """Shared memory buffer of flattened function outputs, one row per iteration.
+
+    Alongside the outputs, the time taken by each row is stored in `row_seconds`
+    (NaN until the row is computed), which lets the progress of workers be followed.
+
+    Use as a context manager, so that the underlying memory is always released.
+    """
+
+    def __init__(self, layout: FieldLayout, iterations: int) -> None:
+        self.layout = layout
+        shape = (iterations, layout.width)
+        self._shm = SharedMemory(
+            create=True,
+            size=max(iterations * (layout.width + 1) * np.float64().itemsize, 1),
+        )
+        self.block = SharedBlock(name=self._shm.name, shape=shape)
+        self.array, self.row_seconds = _block_views(self.block, self._shm.buf)
+        self.row_seconds[:] = np.nan
+
+    def __enter__(self) -> "SharedResults":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        # The arrays must be released before the memory they point to
+        del self.array
+        del self.row_seconds
+        self._shm.close()
+        self._shm.unlink()
+
+    def mean_and_st_dev(self) -> dict[str, BenchmarkArray]:
+        return compute_mean_and_st_dev(self.layout, self.array)
+
+    def covariance(self, max_rank: int) -> Optional[BenchmarkCovariance]:
+        return compute_covariance(self.array, max_rank)
+
+
+def run_into_block(
+    func: Callable[..., BaseModel],
+    items: tuple,
+    block: SharedBlock,
+    layout: FieldLayout,
+    start: int,
+    stop: int,
+) -> None:
+    """Run `func(*items)` for rows `start` to `stop` and store flattened outputs in `block`.
+
+    Executed in worker processes.
+    """
+    shm = SharedMemory(name=block.name)
+    try:
+        array, row_seconds = _block_views(block, shm.buf)
+        for row in range(start, stop):
+            row_start = time.perf_counter()
+            array[row] = output_to_row(func(*items), layout)
+            row_seconds[row] = time.perf_counter() - row_start
+        del array, row_seconds
+    finally:
+        shm.close()
+
+
+def run_async_into_block(
+    func: Callable[..., Awaitable[BaseModel]],
+    items: tuple,
+    block: SharedBlock,
+    layout: FieldLayout,
+    start: int,
+    stop: int,
+    concurrency: int,
+) -> None:
+    """Async counterpart of `run_into_block`.
+
+    Rows `start` to `stop` are evaluated concurrently in a single event loop, with at
+    most `concurrency` calls of `func` in flight.
+    """
+    shm = SharedMemory(name=block.name)
+    try:
+        array, row_seconds = _block_views(block, shm.buf)
+
+        async def run_row(row: int) -> None:
+            row_start = time.perf_counter()
+            output = await func(*items)
+            array[row] = output_to_row(output, layout)
+            row_seconds[row] = time.perf_counter() - row_start
+
+        asyncio.run(
+            gather_with_concurrency(
+                concurrency, (run_row(row) for row in range(start, stop))
+            )
+        )
+        del array, row_seconds
+    finally:
+        shm.close()
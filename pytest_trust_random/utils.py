@@ -1,24 +1,92 @@
+import asyncio
+from typing import Awaitable, Iterable, Sequence, TypeVar
+
+import numpy as np
+from numpy.typing import NDArray
+
 Flat = float | int
-InnerDictType = Flat | dict[str, "InnerDictType"]
+InnerDictType = (
+    Flat | dict[str, "InnerDictType"] | Sequence["InnerDictType"] | NDArray[np.float_]
+)
 DictType = dict[str, InnerDictType]
-FlatDict = dict[str, Flat]
+FlatDict = dict[str, Flat | NDArray[np.float_]]
+
+
+def _flatten_value(value: InnerDictType, key: str) -> FlatDict:
+    if isinstance(value, dict):
+        return flatten_dict(value, prefix=key)
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return _flatten_sequence(value, key)
+    return {key: value}
+
+
+def _flatten_sequence(
+    values: Sequence[InnerDictType] | NDArray[np.float_], key: str
+) -> FlatDict:
+    try:
+        return {key: np.asarray(values, dtype=np.float64).ravel()}
+    except (TypeError, ValueError):
+        # Not a (rectangular) array of numbers, e.g. a list of dictionaries
+        output_dict = {}
+        for i, v in enumerate(values):
+            output_dict.update(_flatten_value(v, f"{key}_{i}"))
+        return output_dict
 
 
 def flatten_dict(input_dict: DictType, prefix: str = "") -> FlatDict:
+    """Flatten nested dictionaries into a single level dictionary.
+
+    Nested keys are joined with `_`. Lists, tuples and numpy arrays of numbers are
+    kept as a single field, converted to a flat float array. Other sequences (e.g. of
+    dictionaries) are expanded elementwise, using the index of the element as the
+    key suffix.
+
+    Args:
+        input_dict (DictType): (possibly nested) dictionary
+        prefix (str): prefix of all the keys in the output
+
+    Returns:
+        FlatDict: dictionary with numeric values and arrays only
+    """
     if prefix == "":
         effective_prefix = ""
     else:
         effective_prefix = prefix + "_"
     output_dict = {}
     for k, v in input_dict.items():
-        if isinstance(v, dict):
-            new_dict = flatten_dict(v, prefix=effective_prefix + k)
-        else:
-            new_dict = {effective_prefix + k: v}
-        output_dict.update(new_dict)
+        output_dict.update(_flatten_value(v, effective_prefix + k))
     return output_dict
 
 
+T = TypeVar("T")
+
+
+async def gather_with_concurrency(
+    limit: int, awaitables: Iterable[Awaitable[T]], return_exceptions: bool = False
+) -> list[T | BaseException]:
+    """Await all `awaitables`, with at most `limit` of them running at once.
+
+    Args:
+        limit (int): maximum number of awaitables running concurrently
+        awaitables (Iterable[Awaitable[T]]): awaitables to run
+        return_exceptions (bool): Whether exceptions are returned in place of the
+                                  results of the awaitables raising them, instead
+                                  of being propagated
+
+    Returns:
+        list[T | BaseException]: results, in the same order as `awaitables`
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run_one(awaitable: Awaitable[T]) -> T:
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(
+        *(run_one(a) for a in awaitables), return_exceptions=return_exceptions
+    )
+
+
 def read_value_from_input(prompt: str, T: type):
     """Read a single value of type `T` from user's input until correct.
 
@@ -2,9 +2,15 @@ from setuptools import setup
 
 setup(
     name="pytest-trust-random",
-    entry_points={"pytest11": ["pytest_trust_random = pytest_trust_random"]},
+    entry_points={
+        "pytest11": ["pytest_trust_random = pytest_trust_random"],
+        "console_scripts": [
+            "trust-random-diff = pytest_trust_random.benchmark_diff:main"
+        ],
+    },
     classifiers=["Framework :: Pytest"],
     version="0.1.0",
     packages=["pytest_trust_random"],
     install_requires=["pytest>=7.0.0"],
+    extras_require={"fast": ["orjson>=3.8.3"]},
 )